@@ -303,6 +303,7 @@ index = {"print_settings": "00_settings.ipynb",
          "DYNAMIC_COMPILATION_ENABLED": "12_performance.ipynb",
          "performance_function": "12_performance.ipynb",
          "AlphaPool": "12_performance.ipynb",
+         "AlphaPoolExecutor": "12_performance.ipynb",
          "mq_ouput_files": "13_export.ipynb",
          "mod_translation": "13_export.ipynb",
          "remove_mods": "13_export.ipynb",
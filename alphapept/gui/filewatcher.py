@@ -92,12 +92,11 @@ def file_watcher_process(
             files = check_file_completion(file, minimum_file_size)
 
             if len(files) > 0:
+                base = os.path.splitext(file)[0]
                 settings = settings_template.copy()
                 settings["experiment"]["file_paths"] = files
-                new_file = os.path.splitext(os.path.split(file)[1])[0] + ".yaml"
-                settings["experiment"]["results_path"] = (
-                    os.path.splitext(file)[0] + ".yaml"
-                )
+                new_file = os.path.basename(base) + ".yaml"
+                settings["experiment"]["results_path"] = base + ".yaml"
 
                 queue_file = os.path.join(QUEUE_PATH, new_file)
 
@@ -188,23 +187,22 @@ def filewatcher():
         if st.button("Start"):
 
             if process_existing:
-                raw_files = [
-                    _
-                    for _ in os.listdir(folder)
-                    if _.lower().endswith(".raw") or _.lower().endswith(".d")
-                ]
+                with os.scandir(folder) as entries:
+                    raw_files = [
+                        _.path
+                        for _ in entries
+                        if _.name.lower().endswith(".raw") or _.name.lower().endswith(".d")
+                    ]
                 st.success(f"Found {len(raw_files)} existing raw files.")
 
                 current = st.progress(0)
 
                 for idx, file in enumerate(raw_files):
-                    file = os.path.join(folder, file)
+                    base = os.path.splitext(file)[0]
                     settings = settings_.copy()
                     settings["experiment"]["file_paths"] = [file]
-                    new_file = os.path.splitext(os.path.split(file)[1])[0] + ".yaml"
-                    settings["experiment"]["results_path"] = (
-                        os.path.splitext(file)[0] + ".yaml"
-                    )
+                    new_file = os.path.basename(base) + ".yaml"
+                    settings["experiment"]["results_path"] = base + ".yaml"
                     save_settings(settings, os.path.join(QUEUE_PATH, new_file))
                     print(f"{datetime.datetime.now()} Added {file}")
 
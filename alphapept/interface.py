@@ -30,17 +30,81 @@ HEADLESS = False
 def tqdm_wrapper(pbar, update: float) -> None:
     """Update a qdm progress bar.
 
+    The bar is only redrawn for changes of at least 1% or upon completion,
+    as callbacks can be called far more often than needed for display.
+
     Args:
         pbar (type): a tqd,.tqdm objet.
         update (float): The new value for the progressbar.
 
     """
-    current_value = pbar.n
-    delta = update - current_value
-    pbar.update(delta)
+    if (abs(update - pbar.n) >= 0.01) or (update >= 1):
+        pbar.n = update
+        pbar.refresh()
 
 # Cell
 
+import os
+import functools
+import importlib
+from typing import NamedTuple
+
+class _FilePaths(NamedTuple):
+    raw: str
+    base: str
+    ext: str
+    filename: str
+    ms_data: str
+
+
+@functools.lru_cache(maxsize=None)
+def _ap(name: str):
+    """Import an alphapept submodule once and return it.
+
+    The workflow steps import their modules lazily to keep `import alphapept.interface` light.
+    Memoizing the lookup avoids going through the import machinery on every step call.
+
+    Args:
+        name (str): The name of the submodule, e.g. 'fasta'.
+
+    Returns:
+        module: The imported `alphapept.<name>` module.
+
+    """
+    return importlib.import_module(f'alphapept.{name}')
+
+
+@functools.lru_cache(maxsize=None)
+def _path_info(file_path: str) -> _FilePaths:
+    """Resolve all paths derived from a raw file path.
+
+    Results are memoized, as every workflow step resolves the same paths again.
+
+    Args:
+        file_path (str): The path of a raw file.
+
+    Returns:
+        _FilePaths: The raw path, its base, its lowercase extension, its file name without extension
+            and the path of its `.ms_data.hdf` file.
+
+    """
+    base, ext = os.path.splitext(file_path)
+    return _FilePaths(file_path, base, ext.lower(), os.path.basename(base), base + ".ms_data.hdf")
+
+
+def _resolve_file_paths(settings: dict) -> list:
+    """Resolve the paths of all raw files of an experiment.
+
+    Args:
+        settings (dict): A dictionary with settings how to process the data.
+
+    Returns:
+        list: A `_FilePaths` tuple per raw file.
+
+    """
+    return [_path_info(_) for _ in settings['experiment']['file_paths']]
+
+
 def check_version_and_hardware(settings: dict) -> dict:
     """Show platform and python information and parse settings.
 
@@ -51,7 +115,6 @@ def check_version_and_hardware(settings: dict) -> dict:
         dict: The parsed settings.
 
     """
-    import alphapept.utils
     #alphapept.utils.check_hardware()
     #alphapept.utils.check_python_env()
     alphapept.utils.show_platform_info()
@@ -83,7 +146,6 @@ def wrapped_partial(func: callable, *args, **kwargs) -> callable:
 
 import os
 import functools
-import copy
 
 def create_database(
     settings: dict,
@@ -106,7 +168,6 @@ def create_database(
         FileNotFoundError: If the FASTA file is not found.
 
     """
-    import alphapept.fasta
     if not logger_set:
         set_logger()
     if not settings_parsed:
@@ -126,9 +187,6 @@ def create_database(
 
         return settings
 
-
-    temp_settings = settings
-
     if os.path.isfile(database_path):
         logging.info(
             'Database path set and exists. Using {} as database.'.format(
@@ -175,7 +233,7 @@ def create_database(
         logging.info('Creating a new database from FASTA.')
 
         if not callback:
-            cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+            cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
         else:
             cb = callback
 
@@ -183,8 +241,8 @@ def create_database(
             spectra,
             pept_dict,
             fasta_dict
-        ) = alphapept.fasta.generate_database_parallel(
-            temp_settings,
+        ) = _ap('fasta').generate_database_parallel(
+            settings,
             callback=cb
         )
         logging.info(
@@ -194,7 +252,7 @@ def create_database(
             )
         )
 
-        alphapept.fasta.save_database(
+        _ap('fasta').save_database(
             spectra,
             pept_dict,
             fasta_dict,
@@ -238,13 +296,12 @@ def import_raw_data(
         settings = check_version_and_hardware(settings)
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
-    import alphapept.io
 
-    settings = parallel_execute(settings, alphapept.io.raw_conversion, callback = cb)
+    settings = parallel_execute(settings, _ap('io').raw_conversion, callback = cb)
 
     return settings
 
@@ -273,14 +330,13 @@ def feature_finding(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.feature_finding
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
-    settings = parallel_execute(settings, alphapept.feature_finding.find_features, callback = cb)
+    settings = parallel_execute(settings, _ap('feature_finding').find_features, callback = cb)
 
     return settings
 
@@ -316,32 +372,27 @@ def search_data(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.search
-    import alphapept.io
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
     if first_search:
         logging.info('Starting first search.')
         if settings['experiment']['database_path'] is not None:
-            settings = parallel_execute(settings, wrapped_partial(alphapept.search.search_db, first_search = first_search), callback = cb)
+            settings = parallel_execute(settings, wrapped_partial(_ap('search').search_db, first_search = first_search), callback = cb)
 
-            db_data = alphapept.fasta.read_database(settings['experiment']['database_path'])
+            db_data = _ap('fasta').read_database(settings['experiment']['database_path'])
 
             fasta_dict = db_data['fasta_dict'].item()
             pept_dict = db_data['pept_dict'].item()
 
 
         else:
-            ms_files = []
-            for _ in settings['experiment']['file_paths']:
-                base, ext = os.path.splitext(_)
-                ms_files.append(base + '.ms_data.hdf')
+            ms_files = [_.ms_data for _ in _resolve_file_paths(settings)]
 
-            fasta_dict = alphapept.search.search_parallel(
+            fasta_dict = _ap('search').search_parallel(
                 settings,
                 callback=cb
             )
@@ -352,23 +403,20 @@ def search_data(
         logging.info('Starting second search with DB.')
 
         if settings['experiment']['database_path'] is not None:
-            settings = parallel_execute(settings, wrapped_partial(alphapept.search.search_db, first_search = first_search), callback = cb)
+            settings = parallel_execute(settings, wrapped_partial(_ap('search').search_db, first_search = first_search), callback = cb)
 
-            db_data = alphapept.fasta.read_database(settings['experiment']['database_path'])
+            db_data = _ap('fasta').read_database(settings['experiment']['database_path'])
 
             fasta_dict = db_data['fasta_dict'].item()
             pept_dict = db_data['pept_dict'].item()
 
 
         else:
-            ms_files = []
-            for _ in settings['experiment']['file_paths']:
-                base, ext = os.path.splitext(_)
-                ms_files.append(base + '.ms_data.hdf')
+            ms_files = [_.ms_data for _ in _resolve_file_paths(settings)]
 
             try:
                 offsets = [
-                    alphapept.io.MS_Data_File(
+                    _ap('io').MS_Data_File(
                         ms_file_name
                     ).read(
                         dataset_name="corrected_mass",
@@ -382,7 +430,7 @@ def search_data(
 
             try:
                 frag_tols = [float(
-                    alphapept.io.MS_Data_File(
+                    _ap('io').MS_Data_File(
                         ms_file_name
                     ).read(dataset_name="estimated_max_fragment_ppm")[0] * settings['search']['calibration_std_prec']) for ms_file_name in ms_files
                 ]
@@ -394,7 +442,7 @@ def search_data(
 
             logging.info('Starting second search.')
 
-            fasta_dict = alphapept.search.search_parallel(
+            fasta_dict = _ap('search').search_parallel(
                 settings,
                 calibration=offsets,
                 fragment_calibration=frag_tols,
@@ -430,15 +478,14 @@ def recalibrate_data(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.recalibration
 
     if settings['search']['calibrate']:
         if not callback:
-            cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+            cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
         else:
             cb = callback
 
-        settings = parallel_execute(settings, alphapept.recalibration.calibrate_hdf, callback = cb)
+        settings = parallel_execute(settings, _ap('recalibration').calibrate_hdf, callback = cb)
 
     return settings
 
@@ -456,8 +503,8 @@ def score(
 
     Args:
         settings (dict): A dictionary with settings how to process the data.
-        pept_dict (dict): A dictionary with peptides. Defaults to None.
-        fasta_dict (dict): A dictionary with fasta sequences. Defaults to None.
+        pept_dict (dict): A dictionary with peptides. Not required for scoring. Defaults to None.
+        fasta_dict (dict): A dictionary with fasta sequences. Not required for scoring. Defaults to None.
         logger_set (bool): If False, reset the default logger. Defaults to False.
         settings_parsed (bool): If True, reparse the settings. Defaults to False.
         callback (callable): A function that accepts a float between 0 and 1 as progress. Defaults to None.
@@ -471,23 +518,14 @@ def score(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.score
-    import alphapept.fasta
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
-    if fasta_dict is None:
-
-        db_data = alphapept.fasta.read_database(
-            settings['experiment']['database_path']
-        )
-        fasta_dict = db_data['fasta_dict'].item()
-        pept_dict = db_data['pept_dict'].item()
-
-    settings = parallel_execute(settings, alphapept.score.score_hdf, callback = cb)
+    # Scoring works on the ms_data files only, the database dictionaries are not sent to the workers.
+    settings = parallel_execute(settings, _ap('score').score_hdf, callback = cb)
 
     return settings
 
@@ -518,15 +556,14 @@ def isobaric_labeling(
             if not settings_parsed:
                 settings = check_version_and_hardware(settings)
 
-            import alphapept.label
 
             if settings['search']['calibrate']:
                 if not callback:
-                    cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+                    cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
                 else:
                     cb = callback
 
-                settings = parallel_execute(settings, alphapept.label.find_labels, callback = cb)
+                settings = parallel_execute(settings, _ap('label').find_labels, callback = cb)
 
     return settings
 
@@ -559,17 +596,15 @@ def protein_grouping(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.score
-    import alphapept.fasta
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
     if fasta_dict is None:
 
-        db_data = alphapept.fasta.read_database(
+        db_data = _ap('fasta').read_database(
             settings['experiment']['database_path']
         )
         fasta_dict = db_data['fasta_dict'].item()
@@ -577,7 +612,7 @@ def protein_grouping(
 
 
     if pept_dict is None: #Pept dict extractions needs scored
-        pept_dict = alphapept.fasta.pept_dict_from_search(settings)
+        pept_dict = _ap('fasta').pept_dict_from_search(settings)
 
     logging.info(f'Fasta dict with length {len(fasta_dict):,}, Pept dict with length {len(pept_dict):,}')
 
@@ -585,11 +620,11 @@ def protein_grouping(
     logging.info('Extracting protein groups.')
 
     if not callback:
-        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
     else:
         cb = callback
 
-    alphapept.score.protein_grouping_all(settings, pept_dict, fasta_dict, callback=cb)
+    _ap('score').protein_grouping_all(settings, pept_dict, fasta_dict, callback=cb)
 
     logging.info('Protein groups complete.')
 
@@ -620,9 +655,8 @@ def align(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.matching
 
-    alphapept.matching.align_datasets(settings, callback = callback)
+    _ap('matching').align_datasets(settings, callback = callback)
 
     return settings
 
@@ -649,10 +683,9 @@ def match(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.matching
 
 
-    alphapept.matching.match_datasets(settings)
+    _ap('matching').match_datasets(settings)
 
     return settings
 
@@ -684,6 +717,112 @@ def read_label_intensity(df : pd.DataFrame, label: NamedTuple) ->  pd.DataFrame:
 
 # Cell
 
+try:
+    import polars
+except ModuleNotFoundError:
+    polars = None
+
+# Tables with fewer rows are grouped with pandas as the conversion to polars does not pay off.
+_POLARS_MIN_ROWS = 1000000
+
+from numba import njit
+
+@njit(cache=True)
+def _sum_by_index(group_idx: np.ndarray, values: np.ndarray, n_groups: int) -> np.ndarray:
+    """Sum values per group index, skipping NaN values like pandas does.
+
+    Args:
+        group_idx (np.ndarray): The group index of each value.
+        values (np.ndarray): The values to sum.
+        n_groups (int): The number of groups.
+
+    Returns:
+        np.ndarray: The sum per group.
+
+    """
+    sums = np.zeros(n_groups, dtype=np.float64)
+    for i in range(len(values)):
+        if not np.isnan(values[i]):
+            sums[group_idx[i]] += values[i]
+
+    return sums
+
+
+def _grouped_sum_codes(df: pd.DataFrame, by: list, column: str) -> pd.DataFrame:
+    """Sum a column of a table per group by encoding all group columns in a single integer key.
+
+    Args:
+        df (pd.DataFrame): The table to aggregate.
+        by (list): The columns to group by.
+        column (str): The column to sum.
+
+    Returns:
+        pd.DataFrame: A table with the group columns and the summed column, sorted by the groups.
+            None if the composite key would overflow.
+
+    """
+    codes, uniques = zip(*[pd.factorize(df[_], sort=True) for _ in by])
+    sizes = tuple(max(len(_), 1) for _ in uniques)
+
+    if np.prod(sizes, dtype=np.float64) >= 2**62:
+        return None
+
+    valid = np.all([_ >= 0 for _ in codes], axis=0) # Rows with missing keys are dropped like in pandas
+    keys = np.ravel_multi_index([_[valid] for _ in codes], sizes)
+    unique_keys, group_idx = np.unique(keys, return_inverse=True)
+
+    values = df[column].to_numpy()[valid]
+    sums = _sum_by_index(group_idx, values.astype(np.float64), len(unique_keys))
+    if values.dtype.kind in 'iu':
+        sums = sums.astype(np.int64)
+
+    df_grouped = pd.DataFrame(
+        {name: uniques[i][_] for i, (name, _) in enumerate(zip(by, np.unravel_index(unique_keys, sizes)))}
+    )
+    df_grouped[column] = sums
+
+    return df_grouped
+
+
+def _grouped_sum(df: pd.DataFrame, by: list, column: str) -> pd.DataFrame:
+    """Sum a column of a table per group.
+
+    Large tables are aggregated with a multithreaded polars pipeline if polars is available.
+    Otherwise, the groups are encoded as a single integer key that is summed with a compiled function.
+    Pandas is only used as fallback for categorical keys or when the integer key would overflow.
+
+    Args:
+        df (pd.DataFrame): The table to aggregate.
+        by (list): The columns to group by.
+        column (str): The column to sum.
+
+    Returns:
+        pd.DataFrame: A table with the group columns and the summed column, sorted by the groups.
+
+    """
+    if (polars is not None) and (len(df) >= _POLARS_MIN_ROWS):
+        df_grouped = (
+            polars.from_pandas(df[by + [column]])
+            .lazy()
+            .drop_nulls(by)
+            .group_by(by)
+            .agg(polars.col(column).sum())
+            .sort(by)
+            .collect()
+            .to_pandas()
+        )
+    else:
+        df_grouped = None
+        if not any(isinstance(df[_].dtype, pd.CategoricalDtype) for _ in by):
+            df_grouped = _grouped_sum_codes(df, by, column)
+        if df_grouped is None:
+            df_grouped = df.groupby(by)[[column]].sum().reset_index()
+
+    return df_grouped
+
+# The peptide tables are written twice to the results file, a fast compression keeps this cheap.
+_HDF_COMPRESSION = {'complib': 'blosc:lz4', 'complevel': 1}
+
 def quantification(
     settings: dict,
     logger_set: bool = False,
@@ -707,7 +846,6 @@ def quantification(
     if not settings_parsed:
         settings = check_version_and_hardware(settings)
 
-    import alphapept.quantification
 
     skip = False
     protein_summary = pd.DataFrame()
@@ -742,7 +880,7 @@ def quantification(
 
                     if len(samples) > 1:
                         logging.info('Delayed Normalization.')
-                        df, normalization = alphapept.quantification.delayed_normalization(
+                        df, normalization = _ap('quantification').delayed_normalization(
                             df,
                             field
                         )
@@ -750,29 +888,30 @@ def quantification(
                             settings['experiment']['results_path'],
                             'fraction_normalization'
                         )
-                        df_grouped = df.groupby(
-                            ['sample_group', 'precursor', 'protein_group']
-                        )[['{}_dn'.format(field)]].sum().reset_index()
+                        df_grouped = _grouped_sum(
+                            df, ['sample_group', 'precursor', 'protein_group'], '{}_dn'.format(field)
+                        )
                     else:
-                        df_grouped = df.groupby(
-                            ['sample_group', 'precursor', 'protein_group']
-                        )[field].sum().reset_index()
+                        df_grouped = _grouped_sum(
+                            df, ['sample_group', 'precursor', 'protein_group'], field
+                        )
 
                     logging.info('Saving protein_groups after delayed normalization to combined_protein_fdr_dn')
                     df.to_hdf(
                         settings['experiment']['results_path'],
-                        'combined_protein_fdr_dn'
+                        'combined_protein_fdr_dn',
+                        **_HDF_COMPRESSION
                     )
 
                     logging.info('Complete.')
                     logging.info('Starting profile extraction.')
 
                     if not callback:
-                        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1))
+                        cb = functools.partial(tqdm_wrapper, tqdm.tqdm(total=1, mininterval=0.1, smoothing=0))
                     else:
                         cb = callback
 
-                    protein_table = alphapept.quantification.protein_profile_parallel_ap(
+                    protein_table = _ap('quantification').protein_profile_parallel_ap(
                         settings,
                         df_grouped,
                         callback=cb
@@ -822,7 +961,8 @@ def quantification(
 
         df.to_hdf(
             results_path,
-            'protein_fdr'
+            'protein_fdr',
+            **_HDF_COMPRESSION
         )
 
         logging.info('Exporting as csv.')
@@ -840,6 +980,11 @@ def quantification(
 
 import yaml
 
+try:
+    from yaml import CDumper as _Dumper
+except ImportError:
+    from yaml import Dumper as _Dumper
+
 def export(
     settings: dict,
     logger_set: bool = False,
@@ -866,7 +1011,7 @@ def export(
     out_path_settings = base+'.yaml'
 
     with open(out_path_settings, 'w') as file:
-        yaml.dump(settings, file)
+        yaml.dump(settings, file, Dumper=_Dumper)
 
     logging.info('Settings saved to {}'.format(out_path_settings))
     logging.info('Analysis complete.')
@@ -921,8 +1066,8 @@ def run_complete_workflow(
 
     if "continue_runs" in workflow:
         if not workflow["continue_runs"]:
-            for _ in settings['experiment']['file_paths']:
-                alphapept.utils.delete_file(os.path.splitext(_)[0]+".ms_data.hdf")
+            for _ in _resolve_file_paths(settings):
+                alphapept.utils.delete_file(_.ms_data)
     if workflow["create_database"]:
         steps.append(create_database)
     if workflow["import_raw_data"]:
@@ -1060,6 +1205,7 @@ def run_complete_workflow(
 from time import time, sleep
 from .__version__ import VERSION_NO
 import datetime
+import h5py
 import alphapept.utils
 
 
@@ -1111,23 +1257,25 @@ def get_file_summary(ms_data: alphapept.io.MS_Data_File, fields: list) -> dict:
     except KeyError:
         n_ms2 = 0
 
-    for key in ms_data.read():
+    # Collect all dataframe groups while opening the file only once
+    with h5py.File(ms_data.file_name, "r") as hdf_file:
+        df_keys = [key for key in sorted(hdf_file) if "is_pd_dataframe" in hdf_file[key].attrs]
 
-        if "is_pd_dataframe" in ms_data.read(attr_name="", group_name=key):
-            df = ms_data.read(dataset_name=key)
+    for key in df_keys:
+        df = ms_data.read(dataset_name=key)
 
-            f_summary[f"{key} (n in table)"] = len(df)
+        f_summary[f"{key} (n in table)"] = len(df)
 
-            if key in ['identifications']:
+        if key in ['identifications']:
 
-                m = df[df["q_value"].gt(0.01)]
+            m = df[df["q_value"].gt(0.01)]
 
-                f_summary['id_rate (0.01)'] = round(float( m['raw_idx'].nunique() / n_ms2),2)
+            f_summary['id_rate (0.01)'] = round(float( m['raw_idx'].nunique() / n_ms2),2)
 
-            if key in ['feature_table','peptide_fdr']:
-                for field in fields:
-                    if field in df.columns:
-                        f_summary[f'{field} ({key}, median)'] = float(df[field].median())
+        if key in ['feature_table','peptide_fdr']:
+            for field in fields:
+                if field in df.columns:
+                    f_summary[f'{field} ({key}, median)'] = float(df[field].median())
 
     return f_summary
 
@@ -1149,15 +1297,13 @@ def get_summary(settings: dict, summary: dict) -> dict:
     fields = ['fwhm','ms1_int_sum_area','ms1_int_sum_apex','ms1_int_max_area','ms1_int_max_apex','rt_length','rt_tail','prec_offset_raw_ppm', 'prec_offset_ppm','mobility']
 
     file_sizes = {}
-    for _ in settings['experiment']['file_paths']:
+    for paths in _resolve_file_paths(settings):
 
-        base, ext = os.path.splitext(_)
-        filename = os.path.split(base)[1]
-        ms_file_name = os.path.splitext(_)[0] + ".ms_data.hdf"
+        filename, ms_file_name = paths.filename, paths.ms_data
 
         file_sizes[ms_file_name] = os.path.getsize(ms_file_name)/1024**2
 
-        ms_data = alphapept.io.MS_Data_File(os.path.splitext(_)[0] + ".ms_data.hdf")
+        ms_data = alphapept.io.MS_Data_File(ms_file_name)
 
         summary[filename] = get_file_summary(ms_data, fields)
 
@@ -1194,8 +1340,153 @@ from .utils import set_logger
 
 import logging
 import sys
-import numpy as np
 import psutil
+import atexit
+from concurrent.futures import ProcessPoolExecutor, Future, as_completed
+
+_WORKER_POOL = None
+_WORKER_POOL_KEY = None
+
+# Workers use the platform default start method. Setting e.g. ALPHAPEPT_START_METHOD=forkserver starts them
+# from a lean server process instead, which requires scripts to guard their entry point with `if __name__ == "__main__":`.
+_WORKER_START_METHOD = os.environ.get('ALPHAPEPT_START_METHOD') or None
+
+def _current_log_file() -> str:
+    """Get the file that the root logger currently writes to.
+
+    Returns:
+        str: The name of the log file or None if there is no file handler.
+
+    """
+    for handler in logging.getLogger().handlers:
+        if isinstance(handler, logging.FileHandler):
+            return handler.baseFilename
+
+    return None
+
+
+def _worker_init(log_file_name: str = None) -> None:
+    """Initialize a worker process of the persistent pool.
+
+    The modules of all workflow steps are imported once per worker,
+    such that this is done in parallel at pool startup and not before the first file is processed.
+    The log handlers are set up again without logging a banner, as workers of the 'spawn' and 'forkserver'
+    start methods inherit neither the imports nor the logging configuration of the parent.
+
+    Args:
+        log_file_name (str): The log file of the parent process. Defaults to None.
+
+    """
+    alphapept.utils._set_log_handlers(log_file_name=log_file_name)
+
+    import alphapept.io
+    import alphapept.feature_finding
+    import alphapept.search
+    import alphapept.recalibration
+    import alphapept.score
+    import alphapept.label
+
+
+def _get_worker_pool(n_processes: int) -> ProcessPoolExecutor:
+    """Get the persistent worker pool.
+
+    The pool is only rebuilt if the number of processes or the log file changes.
+
+    Args:
+        n_processes (int): The number of processes of the pool.
+
+    Returns:
+        ProcessPoolExecutor: The executor that is reused for all workflow steps.
+
+    """
+    global _WORKER_POOL, _WORKER_POOL_KEY
+
+    log_file_name = _current_log_file()
+    key = (n_processes, log_file_name)
+
+    if _WORKER_POOL is not None:
+        if (_WORKER_POOL_KEY != key) or getattr(_WORKER_POOL, '_broken', False):
+            _WORKER_POOL.shutdown(wait=True)
+            _WORKER_POOL = None
+
+    if _WORKER_POOL is None:
+        _WORKER_POOL = alphapept.performance.AlphaPoolExecutor(
+            n_processes,
+            initializer=_worker_init,
+            initargs=(log_file_name,),
+            start_method=_WORKER_START_METHOD
+        )
+        _WORKER_POOL_KEY = key
+
+    return _WORKER_POOL
+
+
+def _shutdown_worker_pool(terminate: bool = False) -> None:
+    """Shut down the persistent worker pool if it exists.
+
+    Args:
+        terminate (bool): If True, pending tasks are cancelled and the workers are killed like with `multiprocessing.Pool.terminate`,
+            such that no task keeps running after an error. Defaults to False.
+
+    """
+    global _WORKER_POOL, _WORKER_POOL_KEY
+
+    if _WORKER_POOL is not None:
+        processes = list((_WORKER_POOL._processes or {}).values())
+        _WORKER_POOL.shutdown(wait=False, cancel_futures=terminate)
+        if terminate:
+            for process in processes:
+                process.terminate()
+            for process in processes:
+                process.join()
+    _WORKER_POOL = None
+    _WORKER_POOL_KEY = None
+
+atexit.register(_shutdown_worker_pool)
+
+
+def _future_succeeded(future: Future, file_name: str, step_name: str) -> bool:
+    """Check the outcome of a workflow step that was submitted to the worker pool.
+
+    Exceptions raised in the worker are logged with their traceback.
+    Steps that catch exceptions themselves report them by returning something else than True.
+
+    Args:
+        future (Future): A completed future of a workflow step.
+        file_name (str): The file that was processed.
+        step_name (str): The name of the workflow step.
+
+    Returns:
+        bool: True if and only if the step was succesful.
+
+    """
+    try:
+        result = future.result()
+    except Exception:
+        logging.exception(f'Processing of {file_name} for step {step_name} failed.')
+        return False
+
+    if result is not True:
+        logging.error(f'Processing of {file_name} for step {step_name} failed. Exception {result}')
+        return False
+
+    return True
+
+
+def _limit_processes_by_memory(n_processes: int, gb_per_process: int) -> int:
+    """Limit the number of processes such that each process has enough of the available memory.
+
+    Args:
+        n_processes (int): The requested number of processes.
+        gb_per_process (int): The memory in GB that each process requires.
+
+    Returns:
+        int: The number of processes, which is at least 1.
+
+    """
+    memory_available = psutil.virtual_memory().available/1024**3
+
+    return min(n_processes, max(int(memory_available // gb_per_process), 1))
 
 
 def parallel_execute(
@@ -1240,62 +1531,64 @@ def parallel_execute(
     else:
         #Limit number of processes for Bruker FF
         if step.__name__ == 'find_features':
-            base, ext = os.path.splitext(files[0])
-            if ext.lower() == '.d':
-                memory_available = psutil.virtual_memory().available/1024**3
-                n_processes_temp = max((int(memory_available //25 ),1))
-                n_processes = min((n_processes, n_processes_temp))
+            ext = _path_info(files[0]).ext
+            if ext == '.d':
+                n_processes = _limit_processes_by_memory(n_processes, 25)
                 logging.info(f'Using Bruker Feature Finder. Setting Process limit to {n_processes}.')
-            elif ext.lower() in ('.raw','.mzml'):
-                memory_available = psutil.virtual_memory().available/1024**3
-                n_processes_temp = max((int(memory_available //8 ), 1))
-                n_processes = min((n_processes, n_processes_temp))
+            elif ext in ('.raw','.mzml'):
+                n_processes = _limit_processes_by_memory(n_processes, 8)
                 logging.info(f'Setting Process limit to {n_processes}')
             else:
                 raise NotImplementedError('Feature Finding: File extension {} not understood.'.format(ext))
 
         if step.__name__ == 'search_db':
-            memory_available = psutil.virtual_memory().available/1024**3
-            n_processes_temp = max((int(memory_available //8 ), 1)) # 8 gb per file: Todo: make this better
-            n_processes = min((n_processes, n_processes_temp))
-            n_processes = min((n_processes, n_files)) #not more processes than files.
+            n_processes = _limit_processes_by_memory(n_processes, 8) # 8 gb per file: Todo: make this better
+            n_processes = min(n_processes, n_files) #not more processes than files.
             logging.info(f'Searching. Setting Process limit to {n_processes}.')
 
 
         failed = []
         rerun = []
-        rerun_map = {}
-        with alphapept.performance.AlphaPool(n_processes) as p:
-            for i, success in enumerate(p.imap(step, to_process)):
-                progress = (i+1)/n_files
-                if success is not True:
-                    failed.append((i, files[i]))
-                    logging.error(f'Processing of {files[i]} for step {step.__name__} failed. Exception {success}')
-                    rerun_map[len(rerun)] = i
-                    rerun.append(to_process[i])
-                else:
+        futures = {}
+        try:
+            executor = _get_worker_pool(n_processes)
+            futures = {executor.submit(step, to_process[i]): i for i in range(n_files)}
+            for n_done, future in enumerate(as_completed(futures)):
+                i = futures[future]
+                progress = (n_done+1)/n_files
+                if _future_succeeded(future, files[i], step.__name__):
                     logging.error(f'Processing of {files[i]} for step {step.__name__} succeeded. {progress*100:.2f} %')
+                else:
+                    failed.append(files[i])
+                    rerun.append(i)
 
                 if callback:
                     callback(progress)
 
-        n_failed = len(failed)
-        if n_failed > 0:
-            ## Retry failed with more memory
-            n_processes_ = max((1, int(n_processes // 2)))
-            logging.info(f'Attempting to rerun failed runs with {n_processes_} processes')
-
-            failed = []
-            with alphapept.performance.AlphaPool(n_processes_) as p:
-                for i, success in enumerate(p.imap(step, rerun)):
-                    progress = (i+1)/n_failed
-                    if success is not True:
-                        failed.append(files[rerun_map[i]])
-                        logging.error(f'Processing of {files[i]} for step {step.__name__} failed. Exception {success}')
-                    else:
+            n_failed = len(failed)
+            if n_failed > 0:
+                ## Retry failed with more memory
+                n_processes_ = max(1, n_processes // 2)
+                logging.info(f'Attempting to rerun failed runs with {n_processes_} processes')
+
+                failed = []
+                executor = _get_worker_pool(n_processes_)
+                futures = {executor.submit(step, to_process[i]): i for i in rerun}
+                for n_done, future in enumerate(as_completed(futures)):
+                    i = futures[future]
+                    progress = (n_done+1)/n_failed
+                    if _future_succeeded(future, files[i], step.__name__):
                         logging.error(f'Processing of {files[i]} for step {step.__name__} succeeded. {progress*100:.2f} %')
+                    else:
+                        failed.append(files[i])
                     if callback:
                         callback(progress)
+        except BaseException:
+            # Stop all workers, e.g. upon KeyboardInterrupt or a failing callback, such that no file is written afterwards.
+            for future in futures:
+                future.cancel()
+            _shutdown_worker_pool(terminate=True)
+            raise
 
     if step.__name__ not in settings['failed']:
         settings['failed'][step.__name__] = failed
@@ -1340,7 +1633,12 @@ CLICK_SETTINGS_OPTION = click.argument(
 
 
 def run_cli() -> None:
-    """Run the command line interface."""
+    """Run the command line interface.
+
+    On Linux, preloading jemalloc (e.g. `LD_PRELOAD=/usr/lib/x86_64-linux-gnu/libjemalloc.so.2 alphapept workflow ...`)
+    can reduce memory fragmentation and the resident memory of long-running worker processes.
+
+    """
 
 
     remote_version = check_github_version()
@@ -494,7 +494,7 @@ def parse_mq_seq(peptide: str) -> str:
 from numba import njit
 import numpy as np
 
-@njit
+@njit(cache=True)
 def get_peaks(int_array: np.ndarray) -> list:
     """Detects peaks in an array.
 
@@ -543,7 +543,7 @@ def get_peaks(int_array: np.ndarray) -> list:
 # Cell
 from numba import njit
 
-@njit
+@njit(cache=True)
 def get_centroid(
     peak: tuple,
     mz_array: np.ndarray,
@@ -576,7 +576,7 @@ def get_centroid(
 
     return mz_cent, mz_int
 
-@njit
+@njit(cache=True)
 def gaussian_estimator(
     peak: tuple,
     mz_array: np.ndarray,
@@ -614,7 +614,7 @@ def gaussian_estimator(
 
 # Cell
 
-@njit
+@njit(cache=True)
 def centroid_data(
     mz_array: np.ndarray,
     int_array: np.ndarray
@@ -652,7 +652,7 @@ import sys
 import os
 import logging
 
-@njit
+@njit(cache=True)
 def get_local_intensity(intensity, window=10):
     """
     Calculate the local intensity for a spectrum.
@@ -886,6 +886,7 @@ def read(
     return_dataset_shape: bool = False,
     return_dataset_dtype: bool = False,
     return_dataset_slice: slice = slice(None),
+    return_dataset_columns: list = None,
     swmr: bool = False,
 ):
     """Read contents of an HDF_File.
@@ -909,6 +910,8 @@ def read(
             Defaults to False.
         return_dataset_slice (slice): Do not read complete dataset to minimize RAM and IO usage.
             Defaults to slice(None).
+        return_dataset_columns (list): Only read these columns of a pd.DataFrame to minimize RAM and IO usage.
+            If None, all columns are read. Defaults to None.
         swmr (bool): Use swmr mode to read data. Defaults to False.
 
     Returns:
@@ -918,6 +921,7 @@ def read(
         KeyError: When the group_name does not exist.
         KeyError: When the attr_name does not exist in the group or dataset.
         KeyError: When the dataset_name does not exist in the group.
+        KeyError: When a column of return_dataset_columns does not exist in the pd.dataframe.
         ValueError: When the requested dataset is not a np.ndarray or pd.dataframe.
 
     """
@@ -979,15 +983,26 @@ def read(
                             )
                         ]
                     else:
+                        if return_dataset_columns is None:
+                            columns = sorted(dataset)
+                        else:
+                            columns = return_dataset_columns
+                            for column in columns:
+                                if column not in dataset:
+                                    raise KeyError(
+                                        f"Column {column} does not exist for "
+                                        f"dataset {dataset_name} of group "
+                                        f"{group_name} of {self}."
+                                    )
                         df = pd.DataFrame(
                             {
                                 column: dataset[column][
                                     return_dataset_slice
-                                ] for column in sorted(dataset)
+                                ] for column in columns
                             }
                         )
                         # TODO: This assumes any object array is a string array
-                        for column in dataset:
+                        for column in df.columns:
                             if df[column].dtype == object:
                                 df[column] = df[column].apply(
                                     lambda x: x if isinstance(x, str) else x.decode('UTF-8')
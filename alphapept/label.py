@@ -4,10 +4,29 @@ __all__ = ['label_search', 'search_label_on_ms_file', 'find_labels']
 
 # Cell
 from numba import njit
-from .search import compare_frags
 import numpy as np
 
-@njit
+@njit(cache=True)
+def _mass_difference(mass1: float, mass2: float, ppm: bool) -> float:
+    """Calculate the difference of two masses in the unit of the fragment tolerance.
+
+    Args:
+        mass1 (float): The query mass.
+        mass2 (float): The reference mass.
+        ppm (bool): Flag to use ppm instead of Dalton.
+
+    Returns:
+        float: The mass difference in ppm or Dalton.
+
+    """
+    delta_mass = mass1 - mass2
+
+    if ppm:
+        return 2 * delta_mass / (mass1 + mass2) * 1e6
+    else:
+        return delta_mass
+
+@njit(cache=True)
 def label_search(query_frag: np.ndarray, query_int: np.ndarray, label: np.ndarray, reporter_frag_tol:float, ppm:bool)-> (np.ndarray, np.ndarray):
     """Function to search for a label for a given spectrum.
 
@@ -27,21 +46,74 @@ def label_search(query_frag: np.ndarray, query_int: np.ndarray, label: np.ndarra
     report = np.zeros(len(label))
     off_mass = np.zeros_like(label)
 
-    hits = compare_frags(query_frag, label, reporter_frag_tol, ppm)
-    for idx, _ in enumerate(hits):
-        if _ > 0:
-            report[idx] = query_int[_-1]
-            off_mass[idx] = query_frag[_-1] - label[idx]
+    # Query fragments are sorted, so the first fragment within tolerance of each label is found by a binary search
+    # for the lower tolerance bound. This assigns the same peaks as compare_frags.
+    # A fragment is only assigned to one label, so the search for the next label starts after the last hit.
+    start = 0
+    n_frags = len(query_frag)
+    for idx in range(len(label)):
+        if ppm:
+            lower = label[idx] * (2e6 - reporter_frag_tol) / (2e6 + reporter_frag_tol)
+        else:
+            lower = label[idx] - reporter_frag_tol
+        pos = start + np.searchsorted(query_frag[start:], lower)
+
+        # Correct for rounding of the bound, such that pos is the first fragment not below the tolerance
+        while (pos > start) and (_mass_difference(query_frag[pos - 1], label[idx], ppm) >= -reporter_frag_tol):
+            pos -= 1
+        while (pos < n_frags) and (_mass_difference(query_frag[pos], label[idx], ppm) < -reporter_frag_tol):
+            pos += 1
+
+        start = pos
+
+        if (pos < n_frags) and (abs(_mass_difference(query_frag[pos], label[idx], ppm)) <= reporter_frag_tol):
+            report[idx] = query_int[pos]
+            off_mass[idx] = query_frag[pos] - label[idx]
 
             if ppm:
-                off_mass[idx] = off_mass[idx] / (query_frag[_-1] + label[idx]) *2 * 1e6
+                off_mass[idx] = off_mass[idx] / (query_frag[pos] + label[idx]) *2 * 1e6
+
+            start = pos + 1
 
     return report, off_mass
 
 # Cell
 from typing import NamedTuple
+from numba import prange
 import alphapept.io
 
+@njit(parallel=True, cache=True)
+def _label_search_batch(query_frags: np.ndarray, query_ints: np.ndarray, starts: np.ndarray, ends: np.ndarray, rows: np.ndarray, label: np.ndarray, reporter_frag_tol:float, ppm:bool, label_intensities: np.ndarray, off_masses: np.ndarray):
+    """Search a label on all given rows of a peptide table at once.
+
+    Args:
+        query_frags (np.ndarray): Array with the fragments of all spectra.
+        query_ints (np.ndarray): Array with the intensities of all spectra.
+        starts (np.ndarray): Array with the start index of the spectrum of each row to search.
+        ends (np.ndarray): Array with the end index of the spectrum of each row to search.
+        rows (np.ndarray): Array with the rows to search.
+        label (np.ndarray): Array with label masses.
+        reporter_frag_tol (float): Fragment tolerance for search.
+        ppm (bool): Flag to use ppm instead of Dalton.
+        label_intensities (np.ndarray): Array in which the intensities per row and channel are written.
+        off_masses (np.ndarray): Array in which the offset masses per row and channel are written.
+
+    """
+    max_mass = label[-1] + 1
+
+    for i in prange(len(rows)):
+        row = rows[i]
+        query_idx_start = starts[i]
+        query_idx_end = ends[i]
+
+        # Fragments are sorted, so all fragments below max_mass end at the binary search position.
+        cut = query_idx_start + np.searchsorted(query_frags[query_idx_start:query_idx_end], max_mass)
+
+        label_int, off_mass = label_search(query_frags[query_idx_start:cut], query_ints[query_idx_start:cut], label, reporter_frag_tol, ppm)
+        label_intensities[row, :] = label_int
+        off_masses[row, :] = off_mass
+
+
 def search_label_on_ms_file(file_name:str, label:NamedTuple, reporter_frag_tol:float, ppm:bool):
     """Wrapper function to search labels on an ms_file and write results to the peptide_fdr of the file.
 
@@ -55,9 +127,9 @@ def search_label_on_ms_file(file_name:str, label:NamedTuple, reporter_frag_tol:f
 
     ms_file = alphapept.io.MS_Data_File(file_name, is_read_only = False)
 
-    df = ms_file.read(dataset_name='peptide_fdr')
-    label_intensities = np.zeros((len(df), len(label.channels)))
-    off_masses = np.zeros((len(df), len(label.channels)))
+    df = ms_file.read(dataset_name='peptide_fdr', return_dataset_columns=['raw_idx', 'sequence'])
+    label_intensities = np.zeros((len(df), len(label.channels)), dtype=np.float32)
+    off_masses = np.zeros((len(df), len(label.channels)), dtype=np.float32)
     labeled = df['sequence'].str.startswith(label.mod_name).values
     query_data = ms_file.read_DDA_query_data()
 
@@ -65,31 +137,35 @@ def search_label_on_ms_file(file_name:str, label:NamedTuple, reporter_frag_tol:f
     query_frags = query_data['mass_list_ms2']
     query_ints = query_data['int_list_ms2']
 
-    for idx, query_idx in enumerate(df['raw_idx']):
-
-        query_idx_start = query_indices[query_idx]
-        query_idx_end = query_indices[query_idx + 1]
-        query_frag = query_frags[query_idx_start:query_idx_end]
-        query_int = query_ints[query_idx_start:query_idx_end]
-
-        query_frag_idx = query_frag < label.masses[-1]+1
-        query_frag = query_frag[query_frag_idx]
-        query_int = query_int[query_frag_idx]
-
-        if labeled[idx]:
-            label_int, off_mass = label_search(query_frag, query_int, label.masses, reporter_frag_tol, ppm)
-            label_intensities[idx, :] = label_int
-            off_masses[idx, :] = off_mass
-
-    df[label.channels] = label_intensities
-    df[[_+'_off_ppm' for _ in label.channels]] = off_masses
-
-    ms_file.write(df, dataset_name="peptide_fdr", overwrite=True) #Overwrite dataframe with label information
+    rows = np.flatnonzero(labeled).astype(np.int64)
+    raw_idx = df['raw_idx'].values[rows]
+    starts = query_indices[raw_idx].astype(np.int64)
+    ends = query_indices[raw_idx + 1].astype(np.int64)
+
+    # Fixed dtypes for the label arguments, so that the compiled kernel is reused for every file.
+    _label_search_batch(
+        query_frags,
+        query_ints,
+        starts,
+        ends,
+        rows,
+        np.ascontiguousarray(label.masses, dtype=np.float64),
+        reporter_frag_tol,
+        ppm,
+        label_intensities,
+        off_masses
+    )
+
+    # Each column of a dataframe is a dataset in its group, so only the label columns are (over)written.
+    for idx, channel in enumerate(label.channels):
+        ms_file.write(label_intensities[:, idx], group_name="peptide_fdr", dataset_name=channel, overwrite=True)
+        ms_file.write(off_masses[:, idx], group_name="peptide_fdr", dataset_name=channel+'_off_ppm', overwrite=True)
 
 
 # Cell
 import logging
 import os
+import numba
 
 from .constants import label_dict
 
@@ -103,8 +179,8 @@ def find_labels(
     Args:
         to_process (dict): A dictionary with settings indicating which files are to be processed and how.
         callback (callable): A function that accepts a float between 0 and 1 as progress. Defaults to None.
-        parallel (bool): If True, process multiple files in parallel.
-            This is not implemented yet!
+        parallel (bool): If True, search the PSMs of the file with all numba threads.
+            Otherwise a single thread is used, as files are then already processed in parallel by `parallel_execute`.
             Defaults to False.
 
     Returns:
@@ -121,7 +197,13 @@ def find_labels(
         reporter_frag_tol = settings['isobaric_label']['reporter_frag_tolerance']
         ppm = settings['isobaric_label']['reporter_frag_tolerance_ppm']
 
-        search_label_on_ms_file(file_name, label, reporter_frag_tol, ppm)
+        n_threads = numba.get_num_threads()
+        if not parallel:
+            numba.set_num_threads(1)
+        try:
+            search_label_on_ms_file(file_name, label, reporter_frag_tol, ppm)
+        finally:
+            numba.set_num_threads(n_threads)
 
         logging.info(f'Tag finding of file {file_name} complete.')
         return True
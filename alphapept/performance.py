@@ -2,7 +2,7 @@
 
 __all__ = ['COMPILATION_MODE_OPTIONS', 'is_valid_compilation_mode', 'set_worker_count', 'MAX_WORKER_COUNT',
            'set_compilation_mode', 'compile_function', '__copy_func', 'DYNAMIC_COMPILATION_ENABLED',
-           'performance_function', 'AlphaPool']
+           'performance_function', 'AlphaPool', 'AlphaPoolExecutor']
 
 # Cell
 
@@ -398,4 +398,45 @@ def AlphaPool(process_count: int) -> multiprocessing.Pool:
         new_max = 1
     logging.info(f"AlphaPool was set to {process_count} processes. Setting max to {new_max}.")
 
-    return Pool(new_max)
\ No newline at end of file
+    return Pool(new_max)
+
+
+from concurrent.futures import ProcessPoolExecutor
+
+def AlphaPoolExecutor(
+    process_count: int,
+    initializer: callable = None,
+    initargs: tuple = (),
+    start_method: str = None,
+) -> ProcessPoolExecutor:
+    """Create a concurrent.futures.ProcessPoolExecutor object.
+
+    Contrary to `AlphaPool`, the executor is intended to be kept alive and reused for multiple tasks.
+
+    Args:
+        process_count (int): The number of processes.
+            If larger than available cores, it is trimmed to the available maximum.
+        initializer (callable): A function that is called once in every worker process upon startup.
+            Defaults to None.
+        initargs (tuple): The arguments passed to the initializer. Defaults to ().
+        start_method (str): The multiprocessing start method of the workers ('fork', 'spawn' or 'forkserver').
+            If None, the platform default is used.
+            Defaults to None.
+
+    Returns:
+        ProcessPoolExecutor: An executor to parallelize functions with multiple processes.
+
+    """
+    max_processes = psutil.cpu_count()
+    new_max = min(process_count, 50, max_processes)
+
+    if new_max == 0:
+        new_max = 1
+    logging.info(f"AlphaPoolExecutor was set to {process_count} processes. Setting max to {new_max}.")
+
+    if start_method is not None:
+        mp_context = multiprocessing.get_context(start_method)
+    else:
+        mp_context = None
+
+    return ProcessPoolExecutor(max_workers=new_max, mp_context=mp_context, initializer=initializer, initargs=initargs)
\ No newline at end of file
@@ -34,11 +34,16 @@ def remove_outliers(
         o_mass_std = np.abs(df['prec_offset_ppm'].std())
         o_mass_median = df['prec_offset_ppm'].median()
 
-        df_sub = df.query('prec_offset_ppm < @o_mass_median+@outlier_std*@o_mass_std and prec_offset_ppm > @o_mass_median-@outlier_std*@o_mass_std').copy()
+        o_mass_ppm = df['prec_offset_ppm'].to_numpy()
+        upper_bound = o_mass_median + outlier_std * o_mass_std
+        lower_bound = o_mass_median - outlier_std * o_mass_std
+
+        df_sub = df[(o_mass_ppm < upper_bound) & (o_mass_ppm > lower_bound)].copy()
 
         return df_sub
 
 # Cell
+from numba import njit
 
 def transform(
     x:  np.ndarray,
@@ -82,12 +87,72 @@ def transform(
         else:
             raise NotImplementedError(f"Type {type_} not known.")
 
+
+@njit(cache=True)
+def _transform(x: np.ndarray, is_relative: bool, scale: float, out: np.ndarray):
+    """Compiled version of `transform` for a single column with a resolved scaling.
+
+    Args:
+        x (np.ndarray): Input array.
+        is_relative (bool): Flag to use a relative (log) instead of an absolute transformation.
+        scale (float): Scaling factor.
+        out (np.ndarray): Array in which the scaled values are written.
+    """
+    if is_relative:
+        for i in range(len(x)):
+            if x[i] > 0:
+                out[i] = np.log(x[i]) / scale
+            else:
+                out[i] = 0.0
+    else:
+        for i in range(len(x)):
+            out[i] = x[i] / scale
+
+
+def _transform_points(
+    points: np.ndarray,
+    columns: list,
+    scaling_dict: dict) -> np.ndarray:
+    """Helper function to transform all columns of a point array at once, as `transform` does per column.
+
+    Args:
+        points (np.ndarray): Input array with one column per entry of columns.
+        columns (list): List of strings to lookup what scaling should be applied to each column.
+        scaling_dict (dict): Lookup dict to retrieve the scaling operation and factor for the columns.
+
+    Raises:
+        KeyError: An error if a column is not present in the dict.
+        NotImplementedError: An error if the scaling operation of a column is not known.
+
+    Returns:
+        np.ndarray: A scaled float64 array.
+    """
+    is_relative = np.zeros(len(columns), dtype=np.bool_)
+    scales = np.zeros(len(columns))
+
+    for idx, column in enumerate(columns):
+        if column not in scaling_dict:
+            raise KeyError(f"Column {column} not in scaling_dict")
+        type_, scales[idx] = scaling_dict[column]
+
+        if type_ == 'relative':
+            is_relative[idx] = True
+        elif type_ != 'absolute':
+            raise NotImplementedError(f"Type {type_} not known.")
+
+    points = points.astype(np.float64, copy=False)
+    transformed = np.empty(points.shape, dtype=np.float64)
+    for idx in range(len(columns)):
+        _transform(points[:, idx], is_relative[idx], scales[idx], transformed[:, idx])
+
+    return transformed
+
 # Cell
 
 from sklearn.neighbors import KNeighborsRegressor
 import logging
 
-def kneighbors_calibration(df: pd.DataFrame, features: pd.DataFrame, cols: list, target: str, scaling_dict: dict, calib_n_neighbors: int) -> np.ndarray:
+def kneighbors_calibration(df: pd.DataFrame, features: pd.DataFrame, cols: list, target: str, scaling_dict: dict, calib_n_neighbors: int, parallel: bool = False) -> np.ndarray:
     """Calibration using a KNeighborsRegressor.
     Input arrays from are transformed to be used with a nearest-neighbor approach.
     Based on neighboring points a calibration is calculated for each input point.
@@ -99,24 +164,18 @@ def kneighbors_calibration(df: pd.DataFrame, features: pd.DataFrame, cols: list,
         target (str): Target column on which offset is calculated.
         scaling_dict (dict): A dictionary that contains how scaling operations are applied.
         calib_n_neighbors (int): Number of neighbors for calibration.
+        parallel (bool, optional): If True, predict with all cores. Otherwise a single core is used, as files are
+            then already processed in parallel by `parallel_execute`. Defaults to False.
 
     Returns:
         np.ndarray: A numpy array with calibrated masses.
     """
 
-    data = df[cols]
-    tree_points = data.values
-
-    for idx, _ in enumerate(data.columns):
-        tree_points[:, idx] = transform(tree_points[:, idx], _, scaling_dict)
-
-    target_points = features[[_+'_matched' for _ in cols]].values
-
-    for idx, _ in enumerate(data.columns):
-        target_points[:, idx] = transform(target_points[:, idx], _, scaling_dict)
+    tree_points = _transform_points(df[cols].values, cols, scaling_dict)
+    target_points = _transform_points(features[[_+'_matched' for _ in cols]].values, cols, scaling_dict)
 
     if len(tree_points) >= calib_n_neighbors:
-        neigh = KNeighborsRegressor(n_neighbors=calib_n_neighbors, weights = 'distance')
+        neigh = KNeighborsRegressor(n_neighbors=calib_n_neighbors, weights = 'distance', n_jobs=-1 if parallel else None)
         neigh.fit(tree_points, df[target].values)
 
         y_hat = neigh.predict(target_points)
@@ -138,6 +197,7 @@ def get_calibration(
     calib_mz_range: int = 100,
     calib_rt_range: float = 0.5,
     calib_mob_range: float = 0.3,
+    parallel: bool = False,
     **kwargs) -> (np.ndarray, float):
     """Wrapper function to get calibrated values for the precursor mass.
 
@@ -149,6 +209,7 @@ def get_calibration(
         calib_mz_range (int, optional): Scaling factor for mz range. Defaults to 20.
         calib_rt_range (float, optional): Scaling factor for rt_range. Defaults to 0.5.
         calib_mob_range (float, optional): Scaling factor for mobility range. Defaults to 0.3.
+        parallel (bool, optional): If True, the regression uses all cores. Defaults to False.
         **kwargs: Arbitrary keyword arguments so that settings can be passes as whole.
 
 
@@ -174,7 +235,7 @@ def get_calibration(
 
     if len(df_sub) > calib_n_neighbors:
 
-        y_hat_ = kneighbors_calibration(df_sub, features, cols, target, scaling_dict, calib_n_neighbors) #ppm
+        y_hat_ = kneighbors_calibration(df_sub, features, cols, target, scaling_dict, calib_n_neighbors, parallel) #ppm
         corrected_mass = (1-y_hat_/1e6) * features['mass_matched']
 
         feature_lookup_dict = features['feature_idx'].to_dict()
@@ -412,10 +473,11 @@ def calibrate_fragments_nn(ms_file_, file_name, settings):
 
             #Read required datasets
 
-            rt_list_ms2 = ms_file_.read_DDA_query_data()['rt_list_ms2']
-            mass_list_ms2 = ms_file_.read_DDA_query_data()['mass_list_ms2']
-            incides_ms2 = ms_file_.read_DDA_query_data()['indices_ms2']
-            scan_idx = np.searchsorted(incides_ms2, np.arange(len(mass_list_ms2)), side='right') - 1
+            rt_list_ms2 = ms_file_.read(dataset_name='rt_list_ms2', group_name='Raw/MS2_scans')
+            incides_ms2 = ms_file_.read(dataset_name='indices_ms2', group_name='Raw/MS2_scans')
+            # Only the number of fragments is needed, not the fragment masses themselves.
+            n_fragments = ms_file_.read(dataset_name='mass_list_ms2', group_name='Raw/MS2_scans', return_dataset_shape=True)[0]
+            scan_idx = np.searchsorted(incides_ms2, np.arange(n_fragments), side='right') - 1
 
             #Estimate offset
             chunk_size = min((len(rt_list_ms2), len(fragment_ions), int(1e4)))
@@ -431,7 +493,7 @@ def calibrate_fragments_nn(ms_file_, file_name, settings):
             try:
                 offset = ms_file_.read(dataset_name = 'corrected_fragment_mzs')
             except KeyError:
-                offset = np.zeros(len(mass_list_ms2))
+                offset = np.zeros(n_fragments)
 
             offset += -y_hat[scan_idx] - median_off_corrected
 
@@ -465,14 +527,16 @@ import os
 
 
 def calibrate_hdf(
-    to_process: tuple, callback=None, parallel=True) -> Union[str,bool]:
+    to_process: tuple, callback=None, parallel=False) -> Union[str,bool]:
     """Wrapper function to get calibrate a hdf file when using the parallel executor.
     The function loads the respective dataframes from the hdf, calls the calibration function and applies the offset.
 
     Args:
         to_process (tuple): Tuple that contains the file index and the settings dictionary.
         callback ([type], optional): Placeholder for callback (unused).
-        parallel (bool, optional): Placeholder for parallel usage (unused).
+        parallel (bool, optional): If True, the precursor calibration uses all cores.
+            Otherwise a single core is used, as files are then already processed in parallel by `parallel_execute`.
+            Defaults to False.
 
     Returns:
         Union[str,bool]: Either True as boolean when calibration is successfull or the Error message as string.
@@ -486,7 +550,13 @@ def calibrate_hdf(
         ms_file = base_file_name+".ms_data.hdf"
         ms_file_ = alphapept.io.MS_Data_File(ms_file, is_overwritable=True)
 
-        features = ms_file_.read(dataset_name='features')
+        # Only the columns used by the precursor calibration are read.
+        available_columns = ms_file_.read(group_name='features')
+        feature_columns = [
+            _ for _ in ['feature_idx', 'mass_matched', 'mz_matched', 'rt_matched', 'mobility_matched']
+            if _ in available_columns
+        ]
+        features = ms_file_.read(dataset_name='features', return_dataset_columns=feature_columns)
 
         try:
             psms =  ms_file_.read(dataset_name='first_search')
@@ -509,6 +579,7 @@ def calibrate_hdf(
                 features,
                 file_name,
                 settings,
+                parallel=parallel,
                 **settings["calibration"]
             )
             ms_file_.write(
@@ -550,7 +621,6 @@ def calibrate_hdf(
 
 import scipy.stats
 import scipy.signal
-import scipy.interpolate
 import alphapept.fasta
 
 #The following function does not have an own unit test but is run by test_calibrate_fragments.
@@ -592,27 +662,72 @@ def get_db_targets(
             ) * 10**6
         ).astype(np.int64)
     )
-    db_mz_distribution = np.zeros_like(tmp_result)
-    for i in range(1, max_ppm):
-        db_mz_distribution[i:] += tmp_result[:-i]
-        db_mz_distribution[:-i] += tmp_result[i:]
+    # Number of masses within max_ppm of each bin (excluding the bin itself), as window sum over a padded cumsum.
+    window = max_ppm - 1
+    padded_cumsum = np.zeros(len(tmp_result) + 2 * window + 1, dtype=np.int64)
+    padded_cumsum[window + 1: window + 1 + len(tmp_result)] = np.cumsum(tmp_result)
+    padded_cumsum[window + 1 + len(tmp_result):] = padded_cumsum[window + len(tmp_result)]
+    db_mz_distribution = padded_cumsum[2 * window + 1:] - padded_cumsum[:len(tmp_result)] - tmp_result
     peaks = scipy.signal.find_peaks(db_mz_distribution, distance=max_ppm)[0]
     db_targets = 10 ** (peaks / 10**6)
     db_array = np.zeros(int(db_targets[-1]) + 1, dtype=np.float64)
-    last_int_mz = -1
-    last_mz = -1
-    for mz in db_targets:
-        mz_int = int(mz)
-        if (mz_int != last_int_mz) & (mz > (last_mz + min_distance)):
-            db_array[mz_int] = mz
-        else:
-            db_array[mz_int] = 0
-        last_int_mz = mz_int
-        last_mz = mz
+    mz_ints = db_targets.astype(np.int64)
+    # A target is kept if it is the first one in its integer bin and far enough from the previous target.
+    is_kept = np.ones(len(db_targets), dtype=np.bool_)
+    is_kept[0] = db_targets[0] > min_distance - 1
+    is_kept[1:] = (mz_ints[1:] != mz_ints[:-1]) & (db_targets[1:] > db_targets[:-1] + min_distance)
+    # The last target of a bin determines its value, i.e. bins with a rejected target are empty.
+    is_last = np.ones(len(db_targets), dtype=np.bool_)
+    is_last[:-1] = mz_ints[1:] != mz_ints[:-1]
+    db_array[mz_ints[is_last]] = np.where(is_kept[is_last], db_targets[is_last], 0)
     return db_array
 
 # Cell
 
+from numba import njit, prange
+
+@njit(parallel=True, cache=True)
+def _min_ppm(mzs: np.ndarray, db_array: np.ndarray, out: np.ndarray):
+    """Calculate the ppm distance of each mz to the closest database target.
+    The candidates are the targets in the integer bin of the mz and its two neighboring bins.
+
+    Args:
+        mzs (np.ndarray): Array with mz values.
+        db_array (np.ndarray): Array with the database target of each integer mz bin.
+        out (np.ndarray): Array in which the ppm distances are written.
+
+    """
+    for i in prange(len(mzs)):
+        mz = mzs[i]
+        selected = np.int64(mz)
+        best = mz - db_array[selected - 1]
+        delta = mz - db_array[selected]
+        if np.abs(delta) < np.abs(best):
+            best = delta
+        delta = mz - db_array[selected + 1]
+        if np.abs(delta) < np.abs(best):
+            best = delta
+        out[i] = best / mz * 10**6
+
+
+@njit(cache=True)
+def _bucket_medians(ordered_ppm: np.ndarray, rt_idx_break: np.ndarray, out: np.ndarray):
+    """Calculate the median of each rt bucket of sorted ppm values.
+
+    Args:
+        ordered_ppm (np.ndarray): Array with ppm values ordered by rt.
+        rt_idx_break (np.ndarray): Array with the start index of each bucket.
+        out (np.ndarray): Array in which the median of each bucket is written, NaN for empty buckets.
+
+    """
+    for i in range(len(out)):
+        start, end = rt_idx_break[i], rt_idx_break[i + 1]
+        if end > start:
+            out[i] = np.median(ordered_ppm[start:end])
+        else:
+            out[i] = np.nan
+
+
 #The following function does not have an own unit test but is run by test_calibrate_fragments.
 def align_run_to_db(
     ms_data_file_name: str,
@@ -643,34 +758,35 @@ def align_run_to_db(
     if ms_level == 1:
         mzs = ms_data.read(dataset_name="mass_matched", group_name="features")
         rts = ms_data.read(dataset_name="rt_matched", group_name="features")
+        is_rt_sorted = False
     elif ms_level == 2:
         mzs = ms_data.read(dataset_name="Raw/MS2_scans/mass_list_ms2")
         inds = ms_data.read(dataset_name="Raw/MS2_scans/indices_ms2")
         precursor_rts = ms_data.read(dataset_name="Raw/MS2_scans/rt_list_ms2")
         rts = np.repeat(precursor_rts, np.diff(inds))
+        # Scans are stored in acquisition order, in which case the peaks do not need to be sorted by rt.
+        is_rt_sorted = np.all(precursor_rts[1:] >= precursor_rts[:-1])
     else:
         raise ValueError(f"{ms_level} is not a valid ms level")
 
-    selected = mzs.astype(np.int64)
-    ds = np.zeros((3, len(selected)))
-    if len(db_array) < len(selected) + 1:
-        tmp = np.zeros(len(selected) + 1)
+    # numba does not check bounds, so the database needs a bin above the largest mz
+    n_bins = len(mzs) + 1
+    if len(mzs) > 0:
+        n_bins = max(n_bins, int(np.nanmax(mzs)) + 2)
+    if len(db_array) < n_bins:
+        tmp = np.zeros(n_bins)
         tmp[:len(db_array)] = db_array
         db_array = tmp
-    ds[0] = mzs - db_array[selected - 1]
-    ds[1] = mzs - db_array[selected]
-    ds[2] = mzs - db_array[selected + 1]
-    min_ds = np.take_along_axis(
-        ds,
-        np.expand_dims(np.argmin(np.abs(ds), axis=0), axis=0),
-        axis=0
-    ).squeeze(axis=0)
-    ppm_ds = min_ds / mzs * 10**6
+    ppm_ds = np.empty(len(mzs), dtype=np.float64)
+    _min_ppm(mzs, db_array, ppm_ds)
 
     selected = np.abs(ppm_ds) < max_ppm_distance
     selected &= np.isfinite(rts)
-    rt_order = np.argsort(rts)
-    rt_order = rt_order[selected[rt_order]]
+    if is_rt_sorted:
+        rt_order = np.flatnonzero(selected)
+    else:
+        rt_order = np.argsort(rts)
+        rt_order = rt_order[selected[rt_order]]
 
 
     ordered_rt = rts[rt_order]
@@ -681,11 +797,8 @@ def align_run_to_db(
         np.arange(ordered_rt[0], ordered_rt[-1], rt_step_size),
         "left"
     )
-    median_ppms = np.empty(len(rt_idx_break) - 1)
-    for i in range(len(median_ppms)):
-        median_ppms[i] = np.median(
-            ordered_ppm[rt_idx_break[i]: rt_idx_break[i + 1]]
-        )
+    median_ppms = np.empty(len(rt_idx_break) - 1, dtype=np.float64)
+    _bucket_medians(ordered_ppm, rt_idx_break, median_ppms)
 
     if plot_ppms:
         import matplotlib.pyplot as plt
@@ -699,17 +812,19 @@ def align_run_to_db(
         )
         plt.show()
 
-    estimated_errors = scipy.interpolate.griddata(
-        rt_step_size / 2 + np.arange(
-            ordered_rt[0],
-            ordered_rt[-1] - 2 * rt_step_size,
-            rt_step_size
-        ),
-        median_ppms,
+    rt_centers = rt_step_size / 2 + np.arange(
+        ordered_rt[0],
+        ordered_rt[-1] - 2 * rt_step_size,
+        rt_step_size
+    )
+    # Linear interpolation between the bucket centers, 0 outside of them.
+    # Medians of buckets beyond the last center are not used.
+    estimated_errors = np.interp(
         rts,
-        fill_value=0,
-        method="linear",
-        rescale=True
+        rt_centers,
+        median_ppms[:len(rt_centers)],
+        left=0,
+        right=0
     )
 
     estimated_errors[~np.isfinite(estimated_errors)] = 0
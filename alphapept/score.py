@@ -82,7 +82,7 @@ def filter_precursor(df: pd.DataFrame) -> pd.DataFrame:
 
 # Cell
 from numba import njit
-@njit
+@njit(cache=True)
 def get_q_values(fdr_values: np.ndarray) -> np.ndarray:
     """
     Calculate q-values from fdr_values.
@@ -10,7 +10,7 @@ import logging
 from numba import njit
 import numpy as np
 
-@njit
+@njit(cache=True)
 def compare_frags(query_frag: np.ndarray, db_frag: np.ndarray, frag_tol: float, ppm:bool=False) -> np.ndarray:
     """Compare query and database frags and find hits
 
@@ -51,7 +51,7 @@ def compare_frags(query_frag: np.ndarray, db_frag: np.ndarray, frag_tol: float,
 
 # Cell
 
-@njit
+@njit(cache=True)
 def ppm_to_dalton(mass:float, prec_tol:int)->float:
     """Function to convert ppm tolerances to Dalton.
 
@@ -357,7 +357,7 @@ def get_psms(
     return psms, 0
 
 # Cell
-@njit
+@njit(cache=True)
 def frag_delta(query_frag:np.ndarray, db_frag:np.ndarray, hits:np.ndarray)-> (float, float):
     """Calculates the mass difference for a given array of hits in Dalton and ppm.
 
@@ -378,7 +378,7 @@ def frag_delta(query_frag:np.ndarray, db_frag:np.ndarray, hits:np.ndarray)-> (fl
     return delta_m, delta_m_ppm
 
 # Cell
-@njit
+@njit(cache=True)
 def intensity_fraction(query_int:np.ndarray, hits:np.ndarray)->float:
     """Calculate the fraction of matched intensity
 
@@ -442,7 +442,7 @@ from numba.typed import List
 FRAG_DTYPE = np.dtype([('ion_index', 'int64'), ('fragment_ion_type', 'int64'), ('fragment_ion_int', 'int64'), ('db_int', 'int64'),
 ('fragment_ion_mass', 'float32'), ('db_mass', 'float32'), ('query_idx', 'int64'), ('db_idx', 'int64'), ('psms_idx', 'int64')])
 
-@njit
+@njit(cache=True)
 def get_hits(query_frag:np.ndarray, query_int:np.ndarray, db_frag:np.ndarray, db_int:np.ndarray, frag_type:np.ndarray, mtol:float, ppm:bool, losses:list)-> np.ndarray:
     """Function to extract the types of hits based on a single PSMs.
 
@@ -502,7 +502,7 @@ LOSS_DICT = constants.loss_dict
 LOSSES = np.array(list(LOSS_DICT.values()))
 
 #This function is a wrapper and ist tested by the quick_test
-@njit
+@njit(cache=True)
 def score(
     psms: np.recarray,
     query_masses: np.ndarray,
@@ -9,6 +9,12 @@ __all__ = ['print_settings', 'load_settings', 'load_settings_as_template', 'save
 import yaml
 import os
 
+# Use the libyaml based C implementations if PyYAML was built with them
+try:
+    from yaml import CFullLoader as _Loader, CDumper as _Dumper
+except ImportError:
+    from yaml import FullLoader as _Loader, Dumper as _Dumper
+
 def print_settings(settings: dict):
     """Print a yaml settings file
 
@@ -25,7 +31,7 @@ def load_settings(path: str):
         path (str): Path to the settings file.
     """
     with open(path, "r") as settings_file:
-        SETTINGS_LOADED = yaml.load(settings_file, Loader=yaml.FullLoader)
+        SETTINGS_LOADED = yaml.load(settings_file, Loader=_Loader)
         return SETTINGS_LOADED
 
 
@@ -63,7 +69,7 @@ def save_settings(settings: dict, path: str):
         os.makedirs(os.path.dirname(path), exist_ok=True)
 
     with open(path, "w") as file:
-        yaml.dump(settings, file, sort_keys=False)
+        yaml.dump(settings, file, Dumper=_Dumper, sort_keys=False)
 
 # Cell
 import pandas as pd
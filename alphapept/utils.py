@@ -5,8 +5,16 @@ import alphapept.io
 import os
 import psutil
 import logging
+import platform
+import functools
+import numba
 from alphapept.__version__ import VERSION_NO
 
+try:
+    import importlib.metadata as importlib_metadata
+except ModuleNotFoundError:
+    importlib_metadata = None
+
 BASE_PATH = os.path.dirname(__file__)
 HOME = os.path.expanduser("~")
 LOG_PATH = os.path.join(HOME, "alphapept", "logs")
@@ -44,15 +52,58 @@ def get_folder_size(start_path: str ) -> float:
     """
 
     total_size = 0
-    for dirpath, dirnames, filenames in os.walk(start_path):
-        for f in filenames:
-            fp = os.path.join(dirpath, f)
+    # scandir entries cache the file type, so each file only needs a single stat call
+    with os.scandir(start_path) as entries:
+        for entry in entries:
             # skip if it is symbolic link
-            if not os.path.islink(fp):
-                total_size += os.path.getsize(fp)
+            if entry.is_symlink():
+                continue
+            if entry.is_dir():
+                total_size += get_folder_size(entry.path)
+            else:
+                total_size += entry.stat().st_size
     return total_size
 
 
+def _set_log_handlers(
+    *,
+    log_file_name: str = None,
+    stream: bool = True,
+    log_level: int = logging.INFO,
+    overwrite: bool = False
+) -> None:
+    """Replace all handlers of the root logger with a stream and a file handler.
+
+    Unlike `set_logger`, nothing is logged, e.g. for worker processes that write to the log of their parent.
+
+    Args:
+        log_file_name (str): The file to which the log is written. If None, no file handler is added. Defaults to None.
+        stream (bool): If True, the log is also sent to stdout. Defaults to True.
+        log_level (int): The logging level. Defaults to logging.INFO.
+        overwrite (bool): If True, overwrite the log file if one exists. Otherwise, append to it. Defaults to False.
+
+    """
+    root = logging.getLogger()
+    formatter = logging.Formatter(
+        '%(asctime)s> %(message)s', "%Y-%m-%d %H:%M:%S"
+    )
+    root.setLevel(log_level)
+    while root.hasHandlers():
+        root.removeHandler(root.handlers[0])
+    if stream:
+        stream_handler = logging.StreamHandler(sys.stdout)
+        stream_handler.setLevel(log_level)
+        stream_handler.setFormatter(formatter)
+        root.addHandler(stream_handler)
+    if log_file_name is not None:
+        if overwrite:
+            file_handler = logging.FileHandler(log_file_name, mode="w")
+        else:
+            file_handler = logging.FileHandler(log_file_name, mode="a")
+        file_handler.setLevel(log_level)
+        file_handler.setFormatter(formatter)
+        root.addHandler(file_handler)
+
 def set_logger(
     *,
     log_file_name: str = "",
@@ -89,18 +140,6 @@ def set_logger(
         The file name to where the log is written.
     """
     import time
-    root = logging.getLogger()
-    formatter = logging.Formatter(
-        '%(asctime)s> %(message)s', "%Y-%m-%d %H:%M:%S"
-    )
-    root.setLevel(log_level)
-    while root.hasHandlers():
-        root.removeHandler(root.handlers[0])
-    if stream:
-        stream_handler = logging.StreamHandler(sys.stdout)
-        stream_handler.setLevel(log_level)
-        stream_handler.setFormatter(formatter)
-        root.addHandler(stream_handler)
     if log_file_name is not None:
         if log_file_name == "":
             if not os.path.exists(LOG_PATH):
@@ -126,19 +165,34 @@ def set_logger(
         directory = os.path.dirname(log_file_name)
         if not os.path.exists(directory):
             os.makedirs(directory)
-        if overwrite:
-            file_handler = logging.FileHandler(log_file_name, mode="w")
-        else:
-            file_handler = logging.FileHandler(log_file_name, mode="a")
-        file_handler.setLevel(log_level)
-        file_handler.setFormatter(formatter)
-        root.addHandler(file_handler)
+    _set_log_handlers(
+        log_file_name=log_file_name,
+        stream=stream,
+        log_level=log_level,
+        overwrite=overwrite
+    )
 
     logging.info(f"Logging to {log_file_name}.")
     logging.info(f"Code location {os.path.dirname(os.path.abspath(__file__))}")
     logging.info(f"Python location {sys.executable}")
     return log_file_name
 
+@functools.lru_cache(maxsize=None)
+def _platform_info() -> dict:
+    """Collect the static platform information once, e.g. platform.processor() runs a subprocess on Linux.
+    """
+    if platform.system() == "Darwin":
+        version = platform.mac_ver()[0]
+    else:
+        version = platform.version()
+    return {
+        "system": platform.system(),
+        "release": platform.release(),
+        "version": version,
+        "machine": platform.machine(),
+        "processor": platform.processor(),
+    }
+
 def show_platform_info() -> None:
     """Log all platform information.
     This is done in the following format:
@@ -151,17 +205,13 @@ def show_platform_info() -> None:
         - [timestamp]> cpu count  - [...]
         - [timestamp]> ram memory - [...]/[...] Gb (available/total)
     """
-    import platform
-    import psutil
+    info = _platform_info()
     logging.info("Platform information:")
-    logging.info(f"system     - {platform.system()}")
-    logging.info(f"release    - {platform.release()}")
-    if platform.system() == "Darwin":
-        logging.info(f"version    - {platform.mac_ver()[0]}")
-    else:
-        logging.info(f"version    - {platform.version()}")
-    logging.info(f"machine    - {platform.machine()}")
-    logging.info(f"processor  - {platform.processor()}")
+    logging.info(f"system     - {info['system']}")
+    logging.info(f"release    - {info['release']}")
+    logging.info(f"version    - {info['version']}")
+    logging.info(f"machine    - {info['machine']}")
+    logging.info(f"processor  - {info['processor']}")
     logging.info(
         f"cpu count  - {psutil.cpu_count()}"
         # f" ({100 - psutil.cpu_percent()}% unused)"
@@ -172,7 +222,7 @@ def show_platform_info() -> None:
         f"{psutil.virtual_memory().total/1024**3:.1f} Gb "
         f"(available/total)"
     )
-    logging.info(f"processor  - {platform.processor()}")
+    logging.info(f"processor  - {info['processor']}")
 
 
 def log_dict(a_dict) -> None:
@@ -194,33 +244,31 @@ def show_python_info() -> None:
         - [timestamp]> [required package] - [current_version]
     """
 
-    try:
-        import importlib.metadata
-        skip = False
-    except ModuleNotFoundError:
-        skip = True
-
-    if not skip:
-        import platform
-        module_versions = {
-            "python": platform.python_version(),
-            "alphapept": VERSION_NO
-        }
-        requirements = importlib.metadata.requires("alphapept")
-        for requirement in requirements:
-            module_name = requirement.split()[0].split(";")[0].split("=")[0]
-            try:
-                module_version = importlib.metadata.version(module_name)
-            except importlib.metadata.PackageNotFoundError:
-                module_version = ""
-            module_versions[module_name] = module_version
-        max_len = max(len(key) for key in module_versions)
+    if importlib_metadata is not None:
         logging.info("Python information:")
-        log_dict(module_versions)
+        log_dict(_python_info())
+
+
+@functools.lru_cache(maxsize=None)
+def _python_info() -> dict:
+    """Collect the versions of python and of the required packages once, as reading the package metadata is slow.
+    """
+    module_versions = {
+        "python": platform.python_version(),
+        "alphapept": VERSION_NO
+    }
+    requirements = importlib_metadata.requires("alphapept")
+    for requirement in requirements:
+        module_name = requirement.split()[0].split(";")[0].split("=")[0]
+        try:
+            module_version = importlib_metadata.version(module_name)
+        except importlib_metadata.PackageNotFoundError:
+            module_version = ""
+        module_versions[module_name] = module_version
+    return module_versions
 
 
 def check_python_env():
-    import numba
     logging.info(f'AlphaPept version {VERSION_NO}')
     logging.info(f'Python version {sys.version}')
     logging.info(f'Numba version {numba.__version__}')
@@ -261,7 +309,6 @@ def check_size(settings):
 def check_settings(settings):
     # _this_file = os.path.abspath(__file__)
     # _this_directory = os.path.dirname(_this_file)
-    import multiprocessing
     logging.info('Check for settings not completely implemented yet.')
 
     logging.info('Size check:')
@@ -388,7 +435,8 @@ def assemble_df(settings, field = 'protein_fdr', callback=None):
 
     if len(all_dfs) > 0:
         xx = pd.concat(all_dfs)
-        xx.to_hdf(settings['experiment']['results_path'], 'combined_'+field)
+        all_dfs.clear() # Release the per-file tables before writing.
+        xx.to_hdf(settings['experiment']['results_path'], 'combined_'+field, complib='blosc:lz4', complevel=1)
     else:
         xx = pd.DataFrame()
 